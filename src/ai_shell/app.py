@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 
 import re
-from rich.markdown import Markdown
+from collections import deque
+from rich.console import Group
 from rich.panel import Panel
-from typing import Optional, List, Dict, Any
+from rich.style import Style
+from rich.text import Text
+from typing import Optional, List, Dict, Any, Deque
 
 from .config import load_config, reset_config
 from .models import ModelManager
@@ -17,6 +20,71 @@ from .terminal_input import TerminalInput
 from .web_search import WebSearchManager
 from .context_manager import ContextManager
 
+# Fenced action blocks the AI can emit, compiled once at import
+_ACTION_BLOCK_RE = re.compile(
+    r"```(?P<type>command|websearch|context_distill|context_prune|context_untruncate)\s*(?P<content>.*?)\s*```",
+    re.DOTALL,
+)
+_ACTION_BLOCK_STRIP_RE = re.compile(
+    r"```(?:command|websearch|context_distill|context_prune|context_untruncate)\s*.*?\s*```",
+    re.DOTALL,
+)
+_CONTEXT_BLOCK_STRIP_RE = re.compile(
+    r"```(?:context_distill|context_prune|context_untruncate)\s*.*?\s*```",
+    re.DOTALL,
+)
+
+def _markdown(text: str):
+    """Build a Markdown renderable; Rich's markdown parser is imported on first use."""
+    from rich.markdown import Markdown
+    return Markdown(text)
+
+
+# SYSTEM MESSAGE templates for task progress feedback, filled with str.format
+_TPL_TASK_APPEARS_COMPLETE = (
+    "SYSTEM MESSAGE: Task appears to be complete for: {request}. "
+    "Please provide a brief summary of what was accomplished."
+)
+_TPL_TASK_INCOMPLETE = (
+    "SYSTEM MESSAGE: The original request ({request}) is not yet complete. "
+    "Please continue with the next step."
+)
+_TPL_COMMAND_CONTINUE = (
+    "SYSTEM MESSAGE: Command executed: {command}\nOutput: {output}\nSuccess: {success}\n\n"
+    "The original request is not yet complete. Please continue with the next step."
+)
+_TPL_COMMAND_COMPLETE = (
+    "SYSTEM MESSAGE: Task completed successfully. Command executed: {command}\n"
+    "Command output: {output}\nSuccess: {success}\n\n"
+    "Please provide a brief summary of what was accomplished based on the command output, "
+    "or answer if the original request was a question."
+)
+_TPL_TASK_RETRY = (
+    "SYSTEM MESSAGE: Command executed but task status check failed.\n"
+    "Command: {command}\nOutput: {output}\nSuccess: {success}\n\n"
+    "Please try a different approach to complete: {request}"
+)
+_TPL_TASK_RETRY_CONTINUE = (
+    "SYSTEM MESSAGE: Command executed but failed.\n"
+    "Command: {command}\nOutput: {output}\nSuccess: {success}\n\n"
+    "User requested to continue trying. Please try a different approach to complete: {request}"
+)
+_TPL_TASK_STOPPED = (
+    "SYSTEM MESSAGE: Task failed after {attempts} attempts and user chose to stop. "
+    "Please provide a summary of what was attempted and suggest alternatives."
+)
+
+_MSG_CONTEXT_APPLIED = "SYSTEM MESSAGE: Context management applied. Continue with your task."
+
+# Theme style used for each role's header and border in /payload
+_ROLE_COLORS = {
+    "system": "warning",
+    "user": "success",
+    "assistant": "accent",
+}
+_PAYLOAD_HEADER_COLORS = frozenset(_ROLE_COLORS.values()) | {"fg"}
+_BOLD = Style(bold=True)
+
 
 class AIShellApp:
     """Main application class for AI Shell Assistant"""
@@ -36,14 +104,53 @@ class AIShellApp:
         self.ai_mode = True
         self.incognito_mode = False
         self.max_retries = 10
+        self._payload_truncate_length = 500
         self.retry_count = 0
         self.original_request = ""
-        self.conversation_history: List[str] = []
+        # One entry per turn (reply, search, or command with its output)
+        self.conversation_history: Deque[str] = deque(maxlen=5)
         self.rejudge = False
         self.rejudge_count = 0
         self.auto_approve_commands = False
         self.safe_commands: set = set(DEFAULT_SAFE_COMMANDS)
         self._running_action_sequence = False
+        
+        # Exact (lowercased) command tokens mapped to handlers returning an action
+        self._exact_commands = self._build_exact_commands()
+        # Commands that take an argument, keyed by their (lowercased) first word
+        self._prefix_commands = {
+            "/save": self._cmd_save_named,
+            "/load": self._cmd_load_named,
+            "/conversations": self._cmd_conversations,
+            "/conversation": self._cmd_conversations,
+            "/cv": self._cmd_conversations,
+            "/delete": self._cmd_delete_named,
+            "/model": self._cmd_switch_model,
+        }
+    
+    def _build_exact_commands(self):
+        """Build the lookup table for commands that must match exactly"""
+        table = {}
+        for tokens, handler in (
+            (("/exit", "exit", "quit", ";q", ":q", "/q"), self._cmd_exit),
+            (("/clear", "/new", "/reset", "/c", "clear"), self._cmd_clear),
+            (("/p", "/payload"), self._cmd_payload),
+            (("/help", "/h", "help"), self._cmd_help),
+            (("/save",), self._cmd_save),
+            (("/load",), self._cmd_load),
+            (("/recent", "/r"), self._cmd_recent),
+            (("/archive",), self._cmd_archive),
+            (("/status",), self._cmd_status),
+            (("/models", "/model", "/m"), self._cmd_models),
+            (("/ai",), lambda: "switch_ai"),
+            (("/dr",), lambda: "switch_direct"),
+            (("/inc",), self._cmd_incognito),
+            (("/compact",), self._cmd_compact),
+            (("/resetconfig",), self._cmd_reset_config),
+        ):
+            for token in tokens:
+                table[token] = handler
+        return table
     
     def initialize(self):
         """Initialize all components"""
@@ -67,6 +174,7 @@ class AIShellApp:
             # Load settings
             settings = self.config.get("settings", {})
             self.max_retries = settings.get("max_retries", 10)
+            self._payload_truncate_length = settings.get("payload_truncate_length", 500)
             self.ai_mode = settings.get("default_mode", "ai").lower() == "ai"
             
             # Load safe commands for auto-approval
@@ -168,28 +276,13 @@ class AIShellApp:
         if not user_input:
             return "continue"
         
-        # Handle exit commands
-        if user_input.lower() in ["/exit", "exit", "quit", ";q", ":q", "/q"]:
-            self.conversation_manager.save_and_exit()
-            return "exit"
-        
-        # Handle clear command
-        if user_input.lower() in ["/clear", "/new", "/reset", "/c", "clear"]:
-            import subprocess
-            subprocess.run("clear", shell=True)
-            self.chat_manager.clear_history()
-            self.context_manager.reset()
-            return "continue"
-        
-        # Handle payload display command
-        if user_input.lower() in ["/p", "/payload"]:
-            self._show_payload()
-            return "continue"
-        
-        # Handle help command
-        if user_input.lower() in ["/help", "/h", "help"]:
-            self.ui.show_help()
-            return "continue"
+        # Exact commands (exit, clear, help, mode switches, ...); try the input
+        # as typed first and only lowercase it when it has uppercase letters
+        handler = self._exact_commands.get(user_input)
+        if handler is None and not user_input.islower():
+            handler = self._exact_commands.get(user_input.lower())
+        if handler is not None:
+            return handler()
         
         # Handle '!' prefix for direct command execution
         if user_input.startswith("!"):
@@ -200,28 +293,14 @@ class AIShellApp:
                     self.ui.console.print(f"[error]Command failed[/error]")
             return "continue"
         
-        # Handle conversation management commands
-        if self._handle_conversation_commands(user_input):
-            return "continue"
-        
-        # Handle model commands
-        if self._handle_model_commands(user_input):
-            return "continue"
-        
-        # Handle mode switching commands
-        if user_input.lower() == "/ai":
-            return "switch_ai"
-        elif user_input.lower() == "/dr":
-            return "switch_direct"
-        elif user_input.lower() == "/inc":
-            self._toggle_incognito_mode()
-            return "continue"
-        elif user_input.lower() == "/compact":
-            self._compact_payload()
-            return "continue"
-        elif user_input.lower() == "/resetconfig":
-            self._handle_reset_config()
-            return "continue"
+        # Handle commands that take an argument (/save <n>, /model <alias>, ...);
+        # they all start with '/', so plain prompts skip the split and lookup
+        if user_input[0] == "/":
+            head, _, rest = user_input.partition(" ")
+            handler = self._prefix_commands.get(head.lower())
+            if handler is not None:
+                handler(rest.strip())
+                return "continue"
         
         # Handle direct mode commands
         if not self.ai_mode:
@@ -233,15 +312,109 @@ class AIShellApp:
         # AI mode - process with AI
         return "process_ai"
     
+    def _cmd_exit(self):
+        """Save the conversation and exit"""
+        self.conversation_manager.save_and_exit()
+        return "exit"
+    
+    def _cmd_clear(self):
+        """Clear the screen and conversation history"""
+        # Escape-sequence clear; no shell or clear(1) process to spawn
+        self.ui.console.clear()
+        self.chat_manager.clear_history()
+        self.context_manager.reset()
+        return "continue"
+    
+    def _cmd_payload(self):
+        """Display the current payload"""
+        self._show_payload()
+        return "continue"
+    
+    def _cmd_help(self):
+        """Display help"""
+        self.ui.show_help()
+        return "continue"
+    
+    def _cmd_save(self):
+        """Save the current conversation"""
+        self.conversation_manager.save_conversation()
+        return "continue"
+    
+    def _cmd_load(self):
+        """Interactively load a saved conversation"""
+        new_payload = self.conversation_manager.load_conversation()
+        if new_payload is not None:
+            self.chat_manager.payload = new_payload
+            self.context_manager.restore_ids_from_saved(new_payload)
+        return "continue"
+    
+    def _cmd_recent(self):
+        """List recent conversations"""
+        self.conversation_manager.list_recent_conversations()
+        return "continue"
+    
+    def _cmd_archive(self):
+        """Archive the current conversation and start fresh"""
+        if self.conversation_manager.archive_conversation():
+            self.chat_manager.clear_history()
+            self.context_manager.reset()
+        return "continue"
+    
+    def _cmd_status(self):
+        """Show conversation status"""
+        self._show_status()
+        return "continue"
+    
+    def _cmd_models(self):
+        """Pick a model with the interactive selector"""
+        # Build model list for the interactive selector
+        available = self.config.get("models", {}).get("available", {})
+        models = []
+        for alias, info in available.items():
+            models.append({
+                "alias": alias,
+                "display_name": info.get("display_name", alias),
+                "api_name": info.get("name", "N/A"),
+            })
+        
+        if not models:
+            self.ui.console.print("[warning]No models configured.[/warning]")
+            return "continue"
+        
+        selected = self.terminal_input.interactive_model_select(
+            models, self.model_manager.current_model
+        )
+        if selected and selected != self.model_manager.current_model:
+            self.model_manager.switch_model(selected)
+        elif selected:
+            self.ui.console.print(f"[muted]Already using {self.model_manager.get_model_display_name(selected)}[/muted]")
+        return "continue"
+    
+    def _cmd_incognito(self):
+        """Toggle incognito mode"""
+        self._toggle_incognito_mode()
+        return "continue"
+    
+    def _cmd_compact(self):
+        """Compact command outputs in the payload"""
+        self._compact_payload()
+        return "continue"
+    
+    def _cmd_reset_config(self):
+        """Reset the configuration"""
+        self._handle_reset_config()
+        return "continue"
+    
     def _show_payload(self):
         """Display current conversation payload"""
-        self.ui.console.print("\n[bold accent]Current Conversation Payload:[/bold accent]")
-        for i, message in enumerate(self.chat_manager.payload):
-            role_color = {
-                "system": "warning",
-                "user": "success", 
-                "assistant": "accent"
-            }.get(message["role"], "fg")
+        console = self.ui.console
+        payload = self.chat_manager.payload
+        items = ["\n[bold accent]Current Conversation Payload:[/bold accent]"]
+        # Header styles resolved once per role colour; plain Text skips markup parsing
+        header_styles = {color: console.get_style(color) + _BOLD for color in _PAYLOAD_HEADER_COLORS}
+        truncate_length = self._payload_truncate_length
+        for i, message in enumerate(payload):
+            role_color = _ROLE_COLORS.get(message["role"], "fg")
             
             # Show message ID and state if available
             msg_id = message.get("_msg_id")
@@ -249,118 +422,62 @@ class AIShellApp:
             id_str = f" (ctx #{msg_id})" if msg_id else ""
             state_str = f" [{state}]" if state and state != "normal" else ""
             
-            self.ui.console.print(f"\n[bold {role_color}][{i+1}]{id_str}{state_str} {message['role'].upper()}:[/bold {role_color}]")
+            items.append(Text(f"\n[{i+1}]{id_str}{state_str} {message['role'].upper()}:", style=header_styles[role_color]))
             content = message["content"]
-            settings = self.config.get("settings", {})
-            truncate_length = settings.get("payload_truncate_length", 500)
             if len(content) > truncate_length:
                 content = content[:truncate_length] + "... [truncated]"
-            from rich.panel import Panel
-            self.ui.console.print(Panel(content, border_style=role_color))
+            items.append(Panel(content, border_style=role_color))
         
         # Show context stats
         if self.context_manager:
-            total_tokens = self.context_manager.get_total_tokens(self.chat_manager.payload)
-            self.ui.console.print(f"\n[muted]Total messages: {len(self.chat_manager.payload)} | Estimated tokens: ~{total_tokens}[/muted]")
+            total_tokens = self.context_manager.get_total_tokens(payload)
+            items.append(f"\n[muted]Total messages: {len(payload)} | Estimated tokens: ~{total_tokens}[/muted]")
         else:
-            self.ui.console.print(f"\n[muted]Total messages: {len(self.chat_manager.payload)}[/muted]")
+            items.append(f"\n[muted]Total messages: {len(payload)}[/muted]")
+        
+        # One print for the whole view instead of one per header and panel
+        console.print(Group(*items))
+    
+    def _cmd_save_named(self, name):
+        """Save the current conversation under a name"""
+        self.conversation_manager.save_conversation(name)
     
-    def _handle_conversation_commands(self, user_input):
-        """Handle conversation management commands"""
-        if user_input.lower() == "/save":
-            self.conversation_manager.save_conversation()
-            return True
-        elif user_input.lower().startswith("/save "):
-            name = user_input[6:].strip()
-            self.conversation_manager.save_conversation(name)
-            return True
-        elif user_input.lower() == "/load":
-            new_payload = self.conversation_manager.load_conversation()
+    def _cmd_load_named(self, index_str):
+        """Load a conversation by recent index or by name"""
+        try:
+            if index_str.isdigit():
+                index = int(index_str)
+                new_payload = self.conversation_manager.load_recent_conversation(index)
+            else:
+                # Try loading by name if it's not a number
+                new_payload = self.conversation_manager.load_conversation(index_str)
             if new_payload is not None:
                 self.chat_manager.payload = new_payload
                 self.context_manager.restore_ids_from_saved(new_payload)
-            return True
-        elif user_input.lower().startswith("/load "):
-            try:
-                index_str = user_input[6:].strip()
-                if index_str.isdigit():
-                    index = int(index_str)
-                    new_payload = self.conversation_manager.load_recent_conversation(index)
-                    if new_payload is not None:
-                        self.chat_manager.payload = new_payload
-                        self.context_manager.restore_ids_from_saved(new_payload)
-                else:
-                    # Try loading by name if it's not a number
-                    name = index_str
-                    new_payload = self.conversation_manager.load_conversation(name)
-                    if new_payload is not None:
-                        self.chat_manager.payload = new_payload
-                        self.context_manager.restore_ids_from_saved(new_payload)
-            except ValueError:
-                self.ui.console.print("[error]Invalid number format[/error]")
-            return True
-        elif user_input.lower().startswith(("/conversations", "/conversation", "/cv")):
-            # Check for -r flag for removal
-            parts = user_input.split()
-            if len(parts) >= 2 and parts[1] == "-r":
-                # Handle removal - get conversation name if provided
-                name = parts[2] if len(parts) > 2 else None
-                self.conversation_manager.delete_conversation(name)
-            else:
-                # Default behavior - list conversations
-                self.conversation_manager.list_recent_conversations()
-                self.ui.console.print()  # Add some spacing
-                self.conversation_manager.list_conversations()
-            return True
-        elif user_input.lower() in ["/recent", "/r"]:
-            self.conversation_manager.list_recent_conversations()
-            return True
-        elif user_input.lower() == "/archive":
-            if self.conversation_manager.archive_conversation():
-                self.chat_manager.clear_history()
-                self.context_manager.reset()
-            return True
-        elif user_input.lower().startswith("/delete "):
-            name = user_input[8:].strip()
+        except ValueError:
+            self.ui.console.print("[error]Invalid number format[/error]")
+    
+    def _cmd_conversations(self, args):
+        """List conversations, or remove one with -r"""
+        # Check for -r flag for removal
+        parts = args.split()
+        if parts and parts[0] == "-r":
+            # Handle removal - get conversation name if provided
+            name = parts[1] if len(parts) > 1 else None
             self.conversation_manager.delete_conversation(name)
-            return True
-        elif user_input.lower() == "/status":
-            self._show_status()
-            return True
-        
-        return False
+        else:
+            # Default behavior - list conversations
+            self.conversation_manager.list_recent_conversations()
+            self.ui.console.print()  # Add some spacing
+            self.conversation_manager.list_conversations()
     
-    def _handle_model_commands(self, user_input):
-        """Handle model management commands"""
-        if user_input.lower() in ["/models", "/model", "/m"]:
-            # Build model list for the interactive selector
-            available = self.config.get("models", {}).get("available", {})
-            models = []
-            for alias, info in available.items():
-                models.append({
-                    "alias": alias,
-                    "display_name": info.get("display_name", alias),
-                    "api_name": info.get("name", "N/A"),
-                })
-            
-            if not models:
-                self.ui.console.print("[warning]No models configured.[/warning]")
-                return True
-            
-            selected = self.terminal_input.interactive_model_select(
-                models, self.model_manager.current_model
-            )
-            if selected and selected != self.model_manager.current_model:
-                self.model_manager.switch_model(selected)
-            elif selected:
-                self.ui.console.print(f"[muted]Already using {self.model_manager.get_model_display_name(selected)}[/muted]")
-            return True
-        elif user_input.lower().startswith("/model "):
-            model_alias = user_input[7:].strip()
-            self.model_manager.switch_model(model_alias)
-            return True
-        
-        return False
+    def _cmd_delete_named(self, name):
+        """Delete a saved conversation by name"""
+        self.conversation_manager.delete_conversation(name)
+    
+    def _cmd_switch_model(self, model_alias):
+        """Switch to a model by alias"""
+        self.model_manager.switch_model(model_alias)
     
     def _show_status(self):
         """Show conversation status"""
@@ -456,6 +573,7 @@ class AIShellApp:
             # Reload settings
             settings = self.config.get("settings", {})
             self.max_retries = settings.get("max_retries", 10)
+            self._payload_truncate_length = settings.get("payload_truncate_length", 500)
             self.ai_mode = settings.get("default_mode", "ai").lower() == "ai"
             
             self.ui.console.print("[success]Configuration reloaded successfully![/success]")
@@ -536,6 +654,11 @@ class AIShellApp:
             self._handle_empty_response()
             return
         
+        # Fast path: no code fence means there can be no action blocks
+        if "```" not in response:
+            self._handle_text_response(response)
+            return
+        
         actions = self._extract_action_blocks(response)
 
         if actions:
@@ -545,13 +668,8 @@ class AIShellApp:
 
     def _extract_action_blocks(self, response: str) -> List[Dict[str, Any]]:
         """Extract supported action blocks in the order they appear."""
-        action_pattern = re.compile(
-            r"```(?P<type>command|websearch|context_distill|context_prune|context_untruncate)\s*(?P<content>.*?)\s*```",
-            re.DOTALL,
-        )
-
         actions: List[Dict[str, Any]] = []
-        for match in action_pattern.finditer(response):
+        for match in _ACTION_BLOCK_RE.finditer(response):
             actions.append(
                 {
                     "type": match.group("type"),
@@ -564,22 +682,14 @@ class AIShellApp:
 
     def _strip_action_blocks_for_display(self, response: str) -> str:
         """Remove action blocks from a response before displaying it."""
-        display_text = re.sub(
-            r"```(?:command|websearch|context_distill|context_prune|context_untruncate)\s*.*?\s*```",
-            "",
-            response,
-            flags=re.DOTALL,
-        )
+        display_text = _ACTION_BLOCK_STRIP_RE.sub("", response)
         return self.chat_manager.strip_response_tags_for_display(display_text).strip()
 
     def _display_action_sequence_message(self, response: str):
         """Display assistant prose for a response that includes action blocks."""
         display_text = self._strip_action_blocks_for_display(response)
         if display_text:
-            md = Markdown(display_text)
-            self.ui.console.print()
-            self.ui.console.print(self.ui.ai_panel(md))
-            self.ui.console.print()
+            self.ui.show_ai_block(_markdown(display_text))
 
     def _handle_action_sequence(self, response: str, actions: List[Dict[str, Any]]):
         """Handle one or more sequential action blocks from a single AI response."""
@@ -610,6 +720,13 @@ class AIShellApp:
         finally:
             self._running_action_sequence = False
     
+    def _append_system_message(self, content: str, label: str) -> Dict[str, Any]:
+        """Append a SYSTEM MESSAGE to the payload and tag it for context management"""
+        msg = {"role": "user", "content": content}
+        self.chat_manager.payload.append(msg)
+        self.context_manager.assign_metadata(msg, label=label)
+        return msg
+    
     def _handle_empty_response(self):
         """Handle empty AI response"""
         assert self.chat_manager is not None
@@ -617,21 +734,11 @@ class AIShellApp:
         self.ui.console.print("[warning]AI provided empty response - treating as task completion signal.[/warning]")
         
         if self.original_request:
-            msg = {
-                "role": "user", 
-                "content": f"SYSTEM MESSAGE: Task appears to be complete for: {self.original_request}. Please provide a brief summary of what was accomplished."
-            }
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label="Task completion prompt")
+            self._append_system_message(_TPL_TASK_APPEARS_COMPLETE.format(request=self.original_request), "Task completion prompt")
             self.rejudge = True
             self.original_request = ""
         else:
-            msg = {
-                "role": "user", 
-                "content": "SYSTEM MESSAGE: You provided an empty response. Please provide a proper response or explain why you cannot proceed."
-            }
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label="Empty response handling")
+            self._append_system_message("SYSTEM MESSAGE: You provided an empty response. Please provide a proper response or explain why you cannot proceed.", "Empty response handling")
             self.rejudge = True
     
     # ─── Context Management Handlers ───────────────────────────────────
@@ -639,16 +746,11 @@ class AIShellApp:
     def _display_context_management_message(self, response):
         """Display the AI's message text from a context management response (stripping tool blocks)"""
         # Strip all context management blocks from the response
-        display_text = re.sub(r"```context_distill\s*.*?\s*```", "", response, flags=re.DOTALL)
-        display_text = re.sub(r"```context_prune\s*.*?\s*```", "", display_text, flags=re.DOTALL)
-        display_text = re.sub(r"```context_untruncate\s*.*?\s*```", "", display_text, flags=re.DOTALL)
+        display_text = _CONTEXT_BLOCK_STRIP_RE.sub("", response)
         display_text = self.chat_manager.strip_response_tags_for_display(display_text).strip()
         
         if display_text:
-            md = Markdown(display_text)
-            self.ui.console.print()
-            self.ui.console.print(self.ui.ai_panel(md))
-            self.ui.console.print()
+            self.ui.show_ai_block(_markdown(display_text))
 
     def _handle_context_distill(self, block_content, display_response: bool = True):
         """Handle a context_distill block."""
@@ -668,21 +770,15 @@ class AIShellApp:
                 distilled_id, label = result
                 self.ui.console.print(f"[muted]  Distilled #{distilled_id}: {label}[/muted]")
                 # Inject continuation message
-                msg = {"role": "user", "content": "SYSTEM MESSAGE: Context management applied. Continue with your task."}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label="Context management confirmation")
+                self._append_system_message(_MSG_CONTEXT_APPLIED, "Context management confirmation")
                 self.rejudge = True
             else:
                 self.ui.console.print(f"[warning]  ✗ Could not distill message #{msg_id} (not found, already pruned, or not prunable)[/warning]")
-                msg = {"role": "user", "content": f"SYSTEM MESSAGE: Could not distill message #{msg_id}. It may not exist, may already be pruned, or is not a prunable message. Continue with your task."}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label="Context management error")
+                self._append_system_message(f"SYSTEM MESSAGE: Could not distill message #{msg_id}. It may not exist, may already be pruned, or is not a prunable message. Continue with your task.", "Context management error")
                 self.rejudge = True
         else:
             self.ui.console.print(f"[warning]  ✗ Invalid context_distill format[/warning]")
-            msg = {"role": "user", "content": "SYSTEM MESSAGE: Invalid context_distill format. Use: id: <number> and summary: <text>. Continue with your task."}
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label="Context management error")
+            self._append_system_message("SYSTEM MESSAGE: Invalid context_distill format. Use: id: <number> and summary: <text>. Continue with your task.", "Context management error")
             self.rejudge = True
     
     def _handle_context_prune(self, block_content, display_response: bool = True):
@@ -702,21 +798,15 @@ class AIShellApp:
             if pruned_info:
                 for pruned_id, label in pruned_info:
                     self.ui.console.print(f"[muted]  Pruned #{pruned_id}: {label}[/muted]")
-                msg = {"role": "user", "content": "SYSTEM MESSAGE: Context management applied. Continue with your task."}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label="Context management confirmation")
+                self._append_system_message(_MSG_CONTEXT_APPLIED, "Context management confirmation")
                 self.rejudge = True
             else:
                 self.ui.console.print(f"[warning]  ✗ No messages were pruned (IDs not found or already pruned)[/warning]")
-                msg = {"role": "user", "content": f"SYSTEM MESSAGE: Could not prune messages with IDs {msg_ids}. They may not exist or are already pruned. Continue with your task."}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label="Context management error")
+                self._append_system_message(f"SYSTEM MESSAGE: Could not prune messages with IDs {msg_ids}. They may not exist or are already pruned. Continue with your task.", "Context management error")
                 self.rejudge = True
         else:
             self.ui.console.print(f"[warning]  ✗ Invalid context_prune format[/warning]")
-            msg = {"role": "user", "content": "SYSTEM MESSAGE: Invalid context_prune format. Use: ids: <id1>, <id2>, ... Continue with your task."}
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label="Context management error")
+            self._append_system_message("SYSTEM MESSAGE: Invalid context_prune format. Use: ids: <id1>, <id2>, ... Continue with your task.", "Context management error")
             self.rejudge = True
     
     def _handle_context_untruncate(self, block_content, display_response: bool = True):
@@ -736,21 +826,15 @@ class AIShellApp:
             if result:
                 untruncated_id, label = result
                 self.ui.console.print(f"[muted]  Untruncated #{untruncated_id}: {label}[/muted]")
-                msg = {"role": "user", "content": "SYSTEM MESSAGE: Message untruncated - full content is now visible. Continue with your task."}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label="Context management confirmation")
+                self._append_system_message("SYSTEM MESSAGE: Message untruncated - full content is now visible. Continue with your task.", "Context management confirmation")
                 self.rejudge = True
             else:
                 self.ui.console.print(f"[warning]  ✗ Could not untruncate message #{msg_id} (not truncated or not found)[/warning]")
-                msg = {"role": "user", "content": f"SYSTEM MESSAGE: Could not untruncate message #{msg_id}. It may not be truncated or does not exist. Continue with your task."}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label="Context management error")
+                self._append_system_message(f"SYSTEM MESSAGE: Could not untruncate message #{msg_id}. It may not be truncated or does not exist. Continue with your task.", "Context management error")
                 self.rejudge = True
         else:
             self.ui.console.print(f"[warning]  ✗ Invalid context_untruncate format[/warning]")
-            msg = {"role": "user", "content": "SYSTEM MESSAGE: Invalid context_untruncate format. Use: id: <number>. Continue with your task."}
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label="Context management error")
+            self._append_system_message("SYSTEM MESSAGE: Invalid context_untruncate format. Use: id: <number>. Continue with your task.", "Context management error")
             self.rejudge = True
 
     # ─── Context Block Parsers ─────────────────────────────────────────
@@ -817,10 +901,7 @@ class AIShellApp:
 
         if display_response:
             display_text = self.chat_manager.strip_response_tags_for_display(command)
-            md = Markdown(display_text)
-            self.ui.console.print()
-            self.ui.console.print(self.ui.ai_panel(md))
-            self.ui.console.print()
+            self.ui.show_ai_block(_markdown(display_text))
 
         if not command:
             self.ui.console.print("[warning]Empty command block detected.[/warning]")
@@ -837,10 +918,7 @@ class AIShellApp:
 
         if display_response:
             display_text = self.chat_manager.strip_response_tags_for_display(query)
-            md = Markdown(display_text)
-            self.ui.console.print()
-            self.ui.console.print(self.ui.ai_panel(md))
-            self.ui.console.print()
+            self.ui.show_ai_block(_markdown(display_text))
 
         if not query:
             self.ui.console.print("[warning]Empty web search block detected.[/warning]")
@@ -857,18 +935,12 @@ class AIShellApp:
         
         # Display response (strip tags for display while keeping original in payload)
         display_response = self.chat_manager.strip_response_tags_for_display(response)
-        md = Markdown(display_response)
-        self.ui.console.print()
-        self.ui.console.print(self.ui.ai_panel(md))
-        self.ui.console.print()
+        self.ui.show_ai_block(_markdown(display_response))
         
         # Check if task completion is needed
         if self.original_request:
             self.conversation_history.append(f"AI Reply: {response}")
             
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
-            
             # Check if this is a question requiring user input
             is_question = self.chat_manager.is_question(response)
             
@@ -891,9 +963,7 @@ class AIShellApp:
                         "The AI has completed the requested task"
                     )
                 else:
-                    msg = {"role": "user", "content": f"SYSTEM MESSAGE: The original request ({self.original_request}) is not yet complete. Please continue with the next step."}
-                    self.chat_manager.payload.append(msg)
-                    self.context_manager.assign_metadata(msg, label="Task continuation")
+                    self._append_system_message(_TPL_TASK_INCOMPLETE.format(request=self.original_request), "Task continuation")
                     self.rejudge = True
     
     def _execute_command_with_confirmation(self, command):
@@ -940,9 +1010,7 @@ class AIShellApp:
         elif user_choice == "n":
             self.ui.console.print("[warning]Command declined.[/warning]")
             cmd_label = command[:60] + "..." if len(command) > 60 else command
-            msg = {"role": "user", "content": f"SYSTEM MESSAGE: Tool use declined by user. The user chose not to execute: `{command}`"}
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label=f"Declined: {cmd_label}")
+            self._append_system_message(f"SYSTEM MESSAGE: Tool use declined by user. The user chose not to execute: `{command}`", f"Declined: {cmd_label}")
             self._running_action_sequence = False
             self.rejudge = False
             # Don't set rejudge — return to user prompt so they can guide the conversation
@@ -973,23 +1041,15 @@ class AIShellApp:
             formatted_results = self.web_search_manager.format_search_results(search_response)
             
             # Track conversation
-            self.conversation_history.append(f"Web Search: {query}")
-            self.conversation_history.append(f"Results: {formatted_results}")
-            
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
+            self.conversation_history.append(f"Web Search: {query}\nResults: {formatted_results}")
             
             # Add search results to conversation context
-            msg = {"role": "user", "content": f"SYSTEM MESSAGE: Web search executed for: {query}\n\nSearch Results:\n{formatted_results}"}
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label=f"Web search: {query_label}")
+            self._append_system_message(f"SYSTEM MESSAGE: Web search executed for: {query}\n\nSearch Results:\n{formatted_results}", f"Web search: {query_label}")
             self.rejudge = True
         else:
             # Search failed
             self.ui.console.print("[error]Web search failed. Please try a different query or approach.[/error]")
-            msg = {"role": "user", "content": f"SYSTEM MESSAGE: Web search failed for query: {query}\n\nPlease try a different approach or rephrase the search query."}
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label=f"Web search failed: {query_label}")
+            self._append_system_message(f"SYSTEM MESSAGE: Web search failed for query: {query}\n\nPlease try a different approach or rephrase the search query.", f"Web search failed: {query_label}")
             self.rejudge = True
 
     def _execute_and_process_command(self, command):
@@ -1010,12 +1070,9 @@ class AIShellApp:
             self.ui.console.print(f"[muted]  Output auto-truncated ({len(result)} chars → {len(truncated_result)} chars)[/muted]")
         
         # Track conversation
-        self.conversation_history.append(f"Command: {command}")
-        self.conversation_history.append(f"Output: {truncated_result}")
-        self.conversation_history.append(f"Success: {success}")
-        
-        if len(self.conversation_history) > 10:
-            self.conversation_history = self.conversation_history[-10:]
+        self.conversation_history.append(
+            f"Command: {command}\nOutput: {truncated_result}\nSuccess: {success}"
+        )
         
         # Command label for context manager
         cmd_label = command[:60] + "..." if len(command) > 60 else command
@@ -1033,13 +1090,11 @@ class AIShellApp:
         
         if not is_complete:
             # Task needs more steps
-            msg = {"role": "user", "content": f"SYSTEM MESSAGE: Command executed: {command}\nOutput: {truncated_result}\nSuccess: {success}\n\nThe original request is not yet complete. Please continue with the next step."}
-            self.chat_manager.payload.append(msg)
-            self.context_manager.assign_metadata(msg, label=f"Command output: {cmd_label}")
+            msg = self._append_system_message(_TPL_COMMAND_CONTINUE.format(command=command, output=truncated_result, success=success), f"Command output: {cmd_label}")
             
             # Store original for untruncate
             if was_truncated:
-                full_content = f"SYSTEM MESSAGE: Command executed: {command}\nOutput: {original_result}\nSuccess: {success}\n\nThe original request is not yet complete. Please continue with the next step."
+                full_content = _TPL_COMMAND_CONTINUE.format(command=command, output=original_result, success=success)
                 msg["_state"] = "truncated"
                 msg["_original_content"] = full_content
             
@@ -1054,13 +1109,11 @@ class AIShellApp:
             self.auto_approve_commands = False
             # Task is complete
             with self.ui.console.status("[bold success]Preparing summary...[/bold success]", spinner_style=self.ui._t["accent"]):
-                msg = {"role": "user", "content": f"SYSTEM MESSAGE: Task completed successfully. Command executed: {command}\nCommand output: {truncated_result}\nSuccess: {success}\n\nPlease provide a brief summary of what was accomplished based on the command output, or answer if the original request was a question."}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label=f"Command output: {cmd_label}")
+                msg = self._append_system_message(_TPL_COMMAND_COMPLETE.format(command=command, output=truncated_result, success=success), f"Command output: {cmd_label}")
                 
                 # Store original for untruncate
                 if was_truncated:
-                    full_content = f"SYSTEM MESSAGE: Task completed successfully. Command executed: {command}\nCommand output: {original_result}\nSuccess: {success}\n\nPlease provide a brief summary of what was accomplished based on the command output, or answer if the original request was a question."
+                    full_content = _TPL_COMMAND_COMPLETE.format(command=command, output=original_result, success=success)
                     msg["_state"] = "truncated"
                     msg["_original_content"] = full_content
             
@@ -1077,9 +1130,7 @@ class AIShellApp:
         if self.retry_count < self.max_retries:
             self.retry_count += 1
             with self.ui.console.status("[bold warning]Preparing retry...[/bold warning]", spinner_style=self.ui._t["warning"]):
-                msg = {"role": "user", "content": f"SYSTEM MESSAGE: Command executed but task status check failed.\nCommand: {command}\nOutput: {result}\nSuccess: {success}\n\nPlease try a different approach to complete: {self.original_request}"}
-                self.chat_manager.payload.append(msg)
-                self.context_manager.assign_metadata(msg, label=f"Task failure: {cmd_label}")
+                self._append_system_message(_TPL_TASK_RETRY.format(command=command, output=result, success=success, request=self.original_request), f"Task failure: {cmd_label}")
             self.rejudge = True
         else:
             self.ui.console.print(f"[warning]Maximum retry attempts ({self.max_retries}) reached.[/warning]")
@@ -1088,14 +1139,10 @@ class AIShellApp:
             if retry_choice == "Y":
                 self.retry_count = 0
                 with self.ui.console.status("[bold warning]Preparing retry...[/bold warning]", spinner_style=self.ui._t["warning"]):
-                    msg = {"role": "user", "content": f"SYSTEM MESSAGE: Command executed but failed.\nCommand: {command}\nOutput: {result}\nSuccess: {success}\n\nUser requested to continue trying. Please try a different approach to complete: {self.original_request}"}
-                    self.chat_manager.payload.append(msg)
-                    self.context_manager.assign_metadata(msg, label=f"Task failure retry: {cmd_label}")
+                    self._append_system_message(_TPL_TASK_RETRY_CONTINUE.format(command=command, output=result, success=success, request=self.original_request), f"Task failure retry: {cmd_label}")
                 self.rejudge = True
             else:
                 with self.ui.console.status("[bold error]Preparing summary...[/bold error]", spinner_style=self.ui._t["error"]):
-                    msg = {"role": "user", "content": f"SYSTEM MESSAGE: Task failed after {self.max_retries} attempts and user chose to stop. Please provide a summary of what was attempted and suggest alternatives."}
-                    self.chat_manager.payload.append(msg)
-                    self.context_manager.assign_metadata(msg, label="Task stopped")
+                    self._append_system_message(_TPL_TASK_STOPPED.format(attempts=self.max_retries), "Task stopped")
                 self.rejudge = True
                 self.retry_count = 0
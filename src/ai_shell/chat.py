@@ -3,89 +3,23 @@
 import json
 import subprocess
 from pathlib import Path
-from openai import OpenAI
 
-from .theme import create_console, get_theme
+from .constants import CONTEXT_FILE_PATH
+from .theme import get_console, get_theme
+
+
+def _parse_response_type(response: str) -> str:
+    """Classify a response by its trailing tag; only the tail is lowercased."""
+    tail = response.rstrip()[-10:].lower()
+    if tail == "[question]":
+        return "question"
+    elif tail == "[complete]":
+        return "complete"
+    return "continue"
 
-class ChatManager:
-    def __init__(self, config, model_manager, conversation_manager=None, web_search_manager=None, context_manager=None):
-        self.config = config
-        self.model_manager = model_manager
-        self.conversation_manager = conversation_manager
-        self.web_search_manager = web_search_manager
-        self.context_manager = context_manager
-        self.theme = get_theme(config)
-        self.console = create_console(config)
-        self.payload = [{"role": "system", "content": self._get_system_prompt()}]
-        self.incognito_mode = False
-        
-        # Initialize OpenAI client (normal mode)
-        self.client = OpenAI(
-            api_key=config["api"]["api_key"], 
-            base_url=config["api"]["url"]
-        )
-        
-        # Initialize incognito client if enabled
-        self.incognito_client = None
-        self._init_incognito_client()
-    
-    def _init_incognito_client(self):
-        """Initialize the incognito mode client"""
-        try:
-            incognito_config = self.config.get("incognito", {})
-            if incognito_config.get("enabled", True):
-                api_config = incognito_config.get("api", {})
-                self.incognito_client = OpenAI(
-                    api_key=api_config.get("api_key", "ollama"),
-                    base_url=api_config.get("url", "http://localhost:11434/v1")
-                )
-        except Exception as e:
-            self.console.print(f"[warning]Warning: Failed to initialize incognito client: {e}[/warning]")
-    
-    def set_incognito_mode(self, incognito_mode: bool):
-        """Set incognito mode state"""
-        self.incognito_mode = incognito_mode
-    
-    def get_current_client(self):
-        """Get the appropriate client based on current mode"""
-        if self.incognito_mode and self.incognito_client:
-            return self.incognito_client
-        return self.client
-    
-    def get_current_model_name(self):
-        """Get the current model name based on mode"""
-        if self.incognito_mode:
-            incognito_config = self.config.get("incognito", {})
-            model_info = incognito_config.get("model", {})
-            return model_info.get("name", "llama3.2:latest")
-        else:
-            return self.model_manager.get_current_model_for_api()
-    
-    def _load_additional_instructions(self):
-        """Load additional instructions from context file in ~/.config/ai-shell/"""
-        try:
-            from .constants import CONTEXT_FILE_PATH
-            
-            # Check if file exists and read it
-            if CONTEXT_FILE_PATH.exists() and CONTEXT_FILE_PATH.is_file():
-                with open(CONTEXT_FILE_PATH, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                
-                if content:
-                    return f"\n\nADDITIONAL GUIDELINES AND INFORMATION FROM THE USER:\n{content}"
-            
-            return ""
-            
-        except Exception as e:
-            # Silently handle errors - don't break the system if context file has issues
-            self.console.print(f"[warning]Warning: Could not load context file: {e}[/warning]")
-            return ""
-    
-    def _get_system_prompt(self):
-        """Get the system prompt for the AI assistant"""
-        web_search_info = ""
-        if self.web_search_manager and self.web_search_manager.is_available():
-            web_search_info = """
+
+# System prompt pieces, assembled by ChatManager._build_system_prompt
+_WEB_SEARCH_BLOCK = """
 
 WEB SEARCH CAPABILITY:
 You have access to a web search tool. This is NOT a traditional keyword-based search engine like Google — it is an AI-powered search model that understands natural language. You should ask it full, detailed questions rather than short keyword queries. Be as specific as needed — the search model will understand context and nuance.
@@ -121,9 +55,7 @@ What is the recommended way to install Docker Engine on Ubuntu 24.04, including
 You may include multiple web search / command / context blocks in one response when they should run sequentially.
 They will execute top-to-bottom, one at a time."""
 
-# ------------------------- #
-
-        context_management_info = """
+_CONTEXT_MANAGEMENT_BLOCK = """
 
 CONTEXT MANAGEMENT:
 You MUST actively manage your conversation context. After every command execution or search result, you should
@@ -183,10 +115,8 @@ Rules:
 - After managing context, you will automatically continue with your task
 - IMPORTANT: Your DEFAULT behavior after a command completes should be to manage its output, then continue. Do not skip this step.
 - REMEMBER: Always write a brief message explaining what you're doing when managing context — it will be shown to the user."""
-        
-        additional_instructions = self._load_additional_instructions()
-        
-        return f"""
+
+_SYSTEM_PROMPT_TEMPLATE = """
 You are a Linux terminal assistant Agent. You can provide explanations and execute commands naturally.{web_search_info}{context_management_info}
 
 COMMAND FORMAT: When you need to run a command, use command blocks like this:
@@ -249,6 +179,111 @@ INFORMATION GATHERING:
 
 The host OS is Linux - use appropriate Linux commands only.{additional_instructions}
 """
+
+
+class ChatManager:
+    def __init__(self, config, model_manager, conversation_manager=None, web_search_manager=None, context_manager=None):
+        self.config = config
+        self.model_manager = model_manager
+        self.conversation_manager = conversation_manager
+        self.web_search_manager = web_search_manager
+        self.context_manager = context_manager
+        self.theme = get_theme(config)
+        self.console = get_console(config)
+        # Built system prompt and the (web search enabled, context.md mtime) it was built for
+        self._system_prompt_cache = None
+        self._system_prompt_key = None
+        self.payload = [{"role": "system", "content": self._get_system_prompt()}]
+        self.incognito_mode = False
+        
+        # Initialize OpenAI client (normal mode); the SDK is imported here rather
+        # than at module load, so importing the package stays cheap
+        from openai import OpenAI
+        self.client = OpenAI(
+            api_key=config["api"]["api_key"], 
+            base_url=config["api"]["url"]
+        )
+        
+        # Initialize incognito client if enabled
+        self.incognito_client = None
+        self._init_incognito_client()
+    
+    def _init_incognito_client(self):
+        """Initialize the incognito mode client"""
+        try:
+            incognito_config = self.config.get("incognito", {})
+            if incognito_config.get("enabled", True):
+                from openai import OpenAI
+                api_config = incognito_config.get("api", {})
+                self.incognito_client = OpenAI(
+                    api_key=api_config.get("api_key", "ollama"),
+                    base_url=api_config.get("url", "http://localhost:11434/v1")
+                )
+        except Exception as e:
+            self.console.print(f"[warning]Warning: Failed to initialize incognito client: {e}[/warning]")
+    
+    def set_incognito_mode(self, incognito_mode: bool):
+        """Set incognito mode state"""
+        self.incognito_mode = incognito_mode
+    
+    def get_current_client(self):
+        """Get the appropriate client based on current mode"""
+        if self.incognito_mode and self.incognito_client:
+            return self.incognito_client
+        return self.client
+    
+    def get_current_model_name(self):
+        """Get the current model name based on mode"""
+        if self.incognito_mode:
+            incognito_config = self.config.get("incognito", {})
+            model_info = incognito_config.get("model", {})
+            return model_info.get("name", "llama3.2:latest")
+        else:
+            return self.model_manager.get_current_model_for_api()
+    
+    def _load_additional_instructions(self):
+        """Load additional instructions from context file in ~/.config/ai-shell/"""
+        try:
+            # Check if file exists and read it
+            if CONTEXT_FILE_PATH.exists() and CONTEXT_FILE_PATH.is_file():
+                with open(CONTEXT_FILE_PATH, 'r', encoding='utf-8') as f:
+                    content = f.read().strip()
+                
+                if content:
+                    return f"\n\nADDITIONAL GUIDELINES AND INFORMATION FROM THE USER:\n{content}"
+            
+            return ""
+            
+        except Exception as e:
+            # Silently handle errors - don't break the system if context file has issues
+            self.console.print(f"[warning]Warning: Could not load context file: {e}[/warning]")
+            return ""
+    
+    def _context_file_mtime(self):
+        """Modification time of the context file, or None if it can't be read"""
+        try:
+            return CONTEXT_FILE_PATH.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def _get_system_prompt(self):
+        """Get the system prompt, rebuilt only when web search availability or context.md changes"""
+        web_search_available = bool(self.web_search_manager and self.web_search_manager.is_available())
+        cache_key = (web_search_available, self._context_file_mtime())
+        if cache_key == self._system_prompt_key:
+            return self._system_prompt_cache
+        
+        self._system_prompt_cache = self._build_system_prompt(web_search_available)
+        self._system_prompt_key = cache_key
+        return self._system_prompt_cache
+    
+    def _build_system_prompt(self, web_search_available):
+        """Build the system prompt for the AI assistant"""
+        return _SYSTEM_PROMPT_TEMPLATE.format(
+            web_search_info=_WEB_SEARCH_BLOCK if web_search_available else "",
+            context_management_info=_CONTEXT_MANAGEMENT_BLOCK,
+            additional_instructions=self._load_additional_instructions(),
+        )
     
     def get_chat_response(self, user_input):
         """Get response from the chat API with streaming"""
@@ -280,15 +315,7 @@ The host OS is Linux - use appropriate Linux commands only.{additional_instructi
         """Parse response type from response tags"""
         if not response:
             return "continue"
-        
-        response_lower = response.lower().strip()
-        
-        if response_lower.endswith("[question]"):
-            return "question"
-        elif response_lower.endswith("[complete]"):
-            return "complete"
-        else:
-            return "continue"
+        return _parse_response_type(response)
     
     def is_question(self, response):
         """Check if response contains a question tag"""
@@ -362,7 +389,6 @@ The host OS is Linux - use appropriate Linux commands only.{additional_instructi
             
             reply_chunk = []
             reasoning_chunk = []
-            full_reply = ""
             has_reasoning = False
             
             with self.console.status(f"[bold accent_alt]Thinking...[/bold accent_alt]") as status:
@@ -372,7 +398,6 @@ The host OS is Linux - use appropriate Linux commands only.{additional_instructi
                     delta = chunk.choices[0].delta
                     if delta.content:
                         reply_chunk.append(delta.content)
-                        full_reply += delta.content
                     
                     if hasattr(delta, 'reasoning_content'):
                         reasoning_content = getattr(delta, 'reasoning_content', None)
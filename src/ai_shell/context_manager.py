@@ -191,9 +191,11 @@ class ContextManager:
         tail = lines[-tail_lines:]
         omitted = total_lines - head_lines - tail_lines
         
-        truncated = '\n'.join(head)
-        truncated += f"\n\n... [{omitted} lines omitted - use context_untruncate to view full output] ...\n\n"
-        truncated += '\n'.join(tail)
+        truncated = ''.join((
+            '\n'.join(head),
+            f"\n\n... [{omitted} lines omitted - use context_untruncate to view full output] ...\n\n",
+            '\n'.join(tail),
+        ))
         
         return truncated, True, content
     
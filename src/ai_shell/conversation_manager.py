@@ -7,14 +7,14 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from rich.table import Table
 from rich.prompt import Confirm, Prompt
-from .theme import create_console, get_theme
+from .theme import get_console, get_theme
 
 class ConversationManager:
     """Manages conversation persistence, auto-save, and recovery"""
     
     def __init__(self, config: Dict, ui_manager=None):
         self.config = config
-        self.console = create_console(config)
+        self.console = get_console(config)
         self._t = get_theme(config or {})
         self.ui_manager = ui_manager
         self.incognito_mode = False
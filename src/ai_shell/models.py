@@ -2,13 +2,13 @@
 
 from rich.table import Table
 
-from .theme import create_console, get_theme
+from .theme import get_console, get_theme
 
 class ModelManager:
     def __init__(self, config):
         self.config = config
         self.theme = get_theme(config)
-        self.console = create_console(config)
+        self.console = get_console(config)
         try:
             self.current_model = config["models"]["response_model"]
         except KeyError as e:
@@ -6,20 +6,29 @@ Provides arrow key navigation, tab completion, proper line editing, and command
 """
 
 import os
+import re
 import sys
+import bisect
+import functools
 import tty
 import html
 import termios
+import types
 import getpass
 import socket
+import atexit
+import queue
+import datetime
+import threading
+import time
 from prompt_toolkit import prompt
 from prompt_toolkit.completion import Completer, Completion
 from prompt_toolkit.history import FileHistory
 from prompt_toolkit.shortcuts import CompleteStyle
-from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.styles import Style
+from prompt_toolkit.formatted_text import HTML, FormattedText, to_formatted_text
+from prompt_toolkit.styles import Style, merge_styles
 from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.application import Application
+from prompt_toolkit.application import Application, get_app
 from prompt_toolkit.layout.containers import HSplit, Window, ConditionalContainer
 from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
 from prompt_toolkit.layout.layout import Layout
@@ -29,10 +38,123 @@ from prompt_toolkit.layout.dimension import Dimension
 
 from .commands import get_prompt_directory
 
+# Matches the $variable placeholders listed in TerminalInput.PROMPT_VARIABLES
+_VAR_RE = re.compile(r'\$(?:model|dir|mode|user|host)')
+
+# Newline fragment placed between rows of the model selector list
+_ROW_SEPARATOR = (("", "\n"),)
+
+@functools.lru_cache(maxsize=8)
+def _base_style(accent: str, accent_alt: str, muted: str) -> Style:
+    """Return the compiled prompt style shared by all modes for a theme.
+
+    Cached per color triple so Style.from_dict runs once per process rather
+    than once per TerminalInput.
+    """
+    return Style.from_dict({
+        # Fallback prompt styles (used by confirmation/reason prompts)
+        'prompt.ai': f'{accent} bold',
+        'prompt.direct': f'{accent_alt} bold',
+        'prompt.incognito': '#8b3fbb bold',
+        'prompt.path': muted,
+        # Completion menu styles
+        'completion-menu.completion': 'noinherit',
+        'completion-menu.completion.current': f'#ffffff bg:{accent} bold',
+        'completion-menu.meta': 'noinherit',
+        'completion': 'noinherit',
+        'completion.current': f'#ffffff bg:{accent} bold',
+        'scrollbar.background': 'hidden',
+        'scrollbar.button': 'hidden',
+        'scrollbar.arrow': 'hidden',
+        'scrollbar': 'hidden',
+        'completion-menu.scrollbar': 'hidden',
+        'completion-menu.scrollbar.background': 'hidden',
+        'completion-menu.scrollbar.button': 'hidden',
+        'completion-menu.scrollbar.arrow': 'hidden',
+    })
+
+
+# Maximum number of built prompts kept in TerminalInput._prompt_cache
+_PROMPT_CACHE_SIZE = 64
+
+
+# Multiline layout only once the input actually contains a newline (Alt+Enter);
+# single-line input, including slash commands, skips that rendering work
+_HAS_NEWLINE = Condition(lambda: '\n' in get_app().current_buffer.text)
+
+
+@functools.lru_cache(maxsize=1)
+def _history_file_path() -> str:
+    """Return the history file path, creating its directory the first time."""
+    history_dir = os.path.expanduser("~/.ai_shell")
+    os.makedirs(history_dir, exist_ok=True)
+    return os.path.join(history_dir, "history")
+
+
+class AsyncFileHistory(FileHistory):
+    """FileHistory that appends to disk on a background thread.
+
+    Submitted lines are queued and written in batches by a daemon thread, so a
+    slow filesystem never delays the next prompt. Pending entries are flushed
+    at interpreter exit. The on-disk format is identical to FileHistory.
+    """
+    
+    # Longest time the exit hook waits for pending entries to reach disk
+    FLUSH_TIMEOUT = 2.0
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def store_string(self, string: str) -> None:
+        # Format now so the timestamp reflects when the line was entered
+        entry = [f"\n# {datetime.datetime.now()}\n"]
+        entry.extend(f"+{line}\n" for line in string.split("\n"))
+        self._queue.put_nowait("".join(entry))
+
+    def _writer_loop(self):
+        """Drain queued entries and append each batch with a single write."""
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.filename, "ab") as f:
+                    # Input is decoded with surrogateescape, so undecodable
+                    # bytes round-trip instead of raising here
+                    f.write("".join(batch).encode("utf-8", "surrogateescape"))
+            except Exception:
+                # History is best-effort; never take down the writer thread
+                pass
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT):
+        """Wait until every queued entry has been written, or timeout seconds pass."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._queue.all_tasks_done.wait(remaining)
+
 
 class InteractiveModelSelector:
     """Interactive model picker with arrow/jk navigation and / search."""
 
+    __slots__ = (
+        'all_models', 'current_alias', 'filtered_models', 'selected_index',
+        'search_mode', 'result', 'theme', '_base_rows', '_search_buffer',
+    )
+
     def __init__(self, models: list, current_alias: str, theme: dict = None):
         """
         Args:
@@ -45,9 +167,16 @@ class InteractiveModelSelector:
         self.filtered_models = list(models)
         self.selected_index = 0
         self.search_mode = False
-        self.search_text = ""
+        # prompt_toolkit handles typing and backspace in the search buffer natively
+        # Read-only outside search mode so stray keys can't edit the query
+        self._search_buffer = Buffer(
+            multiline=False,
+            read_only=Condition(lambda: not self.search_mode),
+            on_text_changed=lambda _: self._apply_filter(),
+        )
         self.result = None  # Will hold selected alias or None
         self.theme = theme or {}
+        self._base_rows = [self._build_row(m, False) for m in self.filtered_models]
 
         # Pre-select the current model
         for i, m in enumerate(self.filtered_models):
@@ -55,6 +184,11 @@ class InteractiveModelSelector:
                 self.selected_index = i
                 break
 
+    @property
+    def search_text(self) -> str:
+        """Current search query typed into the search buffer."""
+        return self._search_buffer.text
+
     def _apply_filter(self):
         """Filter models by search text and reset selection."""
         q = self.search_text.lower()
@@ -67,42 +201,38 @@ class InteractiveModelSelector:
                 or q in m["display_name"].lower()
                 or q in m["api_name"].lower()
             ]
+        self._base_rows = [self._build_row(m, False) for m in self.filtered_models]
         # Clamp selection
         if self.selected_index >= len(self.filtered_models):
             self.selected_index = max(0, len(self.filtered_models) - 1)
 
+    def _build_row(self, m: dict, selected: bool) -> tuple:
+        """Return the (pointer, name, alias) fragments for one model row."""
+        if selected:
+            return (
+                ("class:ms.accent", " > "),
+                ("class:ms.accent", m['display_name']),
+                ("class:ms.accent.dim", f"  {m['alias']}"),
+            )
+        name_style = "class:ms.current" if m["alias"] == self.current_alias else "class:ms.item"
+        return (
+            ("class:ms.dim", "   "),
+            (name_style, m['display_name']),
+            ("class:ms.dim", f"  {m['alias']}"),
+        )
+
     def _get_list_content(self):
         """Return formatted text tuples for the model list."""
-        fragments = []
         if not self.filtered_models:
-            fragments.append(("class:ms.dim", "  no results\n"))
-            return fragments
-
-        for i, m in enumerate(self.filtered_models):
-            is_selected = (i == self.selected_index)
-            is_current = (m["alias"] == self.current_alias)
-
-            if is_selected:
-                pointer = " > "
-                name_style = "class:ms.accent"
-                alias_style = "class:ms.accent.dim"
-            elif is_current:
-                pointer = "   "
-                name_style = "class:ms.current"
-                alias_style = "class:ms.dim"
-            else:
-                pointer = "   "
-                name_style = "class:ms.item"
-                alias_style = "class:ms.dim"
-
-            fragments.append(("class:ms.accent" if is_selected else "class:ms.dim", pointer))
-            fragments.append((name_style, m['display_name']))
-            fragments.append((alias_style, f"  {m['alias']}"))
-            fragments.append(("", "\n"))
+            return [("class:ms.dim", "  no results\n")]
 
-        # Remove trailing newline
-        if fragments and fragments[-1] == ("", "\n"):
-            fragments.pop()
+        # Rows are prebuilt by _apply_filter; only the selected one is rebuilt
+        fragments = []
+        selected = self.selected_index
+        for i, row in enumerate(self._base_rows):
+            if i:
+                fragments += _ROW_SEPARATOR
+            fragments += row if i != selected else self._build_row(self.filtered_models[i], True)
 
         return fragments
 
@@ -113,24 +243,18 @@ class InteractiveModelSelector:
         ]
 
     def _get_search_content(self):
-        """Return formatted text for the search bar."""
+        """Return formatted text for the search bar prefix (the query is the buffer)."""
         if self.search_mode:
-            return [
-                ("class:ms.accent", "\n / "),
-                ("class:ms.item", self.search_text),
-                ("class:ms.accent", "█"),
-            ]
+            return [("class:ms.accent", " / ")]
         elif self.search_text:
-            return [
-                ("class:ms.dim", f"\n / {self.search_text}"),
-            ]
-        return [("", "\n")]
+            return [("class:ms.dim", " / ")]
+        return []
 
     def run(self) -> str | None:
         """Show the interactive selector. Returns selected alias or None."""
         from prompt_toolkit.application import Application
-        from prompt_toolkit.layout.containers import HSplit, Window
-        from prompt_toolkit.layout.controls import FormattedTextControl
+        from prompt_toolkit.layout.containers import HSplit, VSplit, Window
+        from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
         from prompt_toolkit.layout.layout import Layout
         from prompt_toolkit.key_binding import KeyBindings
         from prompt_toolkit.styles import Style
@@ -138,14 +262,31 @@ class InteractiveModelSelector:
         selector = self  # Reference for closures
 
         header_control = FormattedTextControl(lambda: selector._get_header_content())
-        list_control = FormattedTextControl(lambda: selector._get_list_content())
+        # Focusable so the list, not the search buffer, holds focus while navigating
+        list_control = FormattedTextControl(lambda: selector._get_list_content(), focusable=True)
         search_control = FormattedTextControl(lambda: selector._get_search_content())
 
+        list_window = Window(
+            list_control,
+            # Shrink with the filter so the layout never reserves empty rows
+            height=lambda: Dimension.exact(min(len(selector.filtered_models) or 1, 20)),
+            always_hide_cursor=True,
+        )
+        search_window = Window(
+            BufferControl(buffer=selector._search_buffer),
+            height=1,
+            style=lambda: "class:ms.item" if selector.search_mode else "class:ms.dim",
+        )
+
         layout = Layout(HSplit([
             Window(header_control, height=1),
-            Window(list_control, height=min(len(self.all_models), 20)),
-            Window(search_control, height=2),
-        ]))
+            list_window,
+            Window(height=1),
+            VSplit([
+                Window(search_control, height=1, dont_extend_width=True),
+                search_window,
+            ]),
+        ]), focused_element=list_window)
 
         kb = KeyBindings()
 
@@ -164,12 +305,14 @@ class InteractiveModelSelector:
         @kb.add("/", filter=Condition(lambda: not selector.search_mode))
         def enter_search(event):
             selector.search_mode = True
+            event.app.layout.focus(search_window)
 
         @kb.add("escape")
         def on_escape(event):
             if selector.search_mode:
                 # Exit search mode; if search is empty, clear filter
                 selector.search_mode = False
+                event.app.layout.focus(list_window)
                 if not selector.search_text:
                     selector._apply_filter()
             else:
@@ -187,6 +330,7 @@ class InteractiveModelSelector:
             if selector.search_mode:
                 # Apply search and return to navigation
                 selector.search_mode = False
+                event.app.layout.focus(list_window)
                 selector._apply_filter()
             else:
                 # Select the current model
@@ -194,25 +338,11 @@ class InteractiveModelSelector:
                     selector.result = selector.filtered_models[selector.selected_index]["alias"]
                 event.app.exit()
 
-        @kb.add("backspace", filter=Condition(lambda: selector.search_mode))
-        def on_backspace(event):
-            if selector.search_text:
-                selector.search_text = selector.search_text[:-1]
-                selector._apply_filter()
-
         @kb.add("c-c")
         def on_ctrl_c(event):
             selector.result = None
             event.app.exit()
 
-        # Catch all printable characters when in search mode
-        @kb.add("<any>", filter=Condition(lambda: selector.search_mode))
-        def on_search_char(event):
-            char = event.data
-            if char.isprintable() and len(char) == 1:
-                selector.search_text += char
-                selector._apply_filter()
-
         accent = selector.theme.get("accent", "#0066cc")
         muted = selector.theme.get("muted", "#555555")
         style = Style.from_dict({
@@ -233,52 +363,80 @@ class InteractiveModelSelector:
         return selector.result
 
 
+_COMMANDS = types.MappingProxyType({
+    '/exit': 'Exit the AI Shell',
+    '/quit': 'Exit the AI Shell',
+    '/clear': 'Clear conversation history and start fresh',
+    '/new': 'Clear conversation history and start fresh',
+    '/reset': 'Clear conversation history and start fresh',
+    '/help': 'Show help information',
+    '/payload': 'Display current conversation payload',
+    '/save': 'Save current conversation',
+    '/load': 'Load a saved conversation',
+    '/conversations': 'List all saved conversations (use -r to remove)',
+    '/cv': 'List all saved conversations (use -r to remove)',
+    '/archive': 'Archive current conversation',
+    '/delete': 'Delete a saved conversation',
+    '/status': 'Show conversation status',
+    '/models': 'List available models',
+    '/model': 'Switch to a different model',
+    '/ai': 'Switch to AI mode',
+    '/dr': 'Switch to Direct mode',
+    '/inc': 'Toggle incognito mode',
+    '/compact': 'Compact command outputs in current payload',
+    '/recent': 'List recent conversations',
+    '/r': 'List recent conversations'
+})
+# Precomputed once and shared by every menu so filtering doesn't re-list per
+# keystroke; the sorted keys let prefix matches be found by bisection.
+# Commands are all lowercase, so matching is case-sensitive and never lowers input
+_COMMAND_ITEMS = tuple(_COMMANDS.items())
+_COMMAND_ITEMS_SORTED = tuple(sorted(_COMMANDS.items()))
+_COMMAND_KEYS_SORTED = [cmd for cmd, _ in _COMMAND_ITEMS_SORTED]
+# "cmd - description" labels, shared by the menu and the completer
+_COMMAND_DISPLAYS = types.MappingProxyType(
+    {cmd: f"{cmd} - {desc}" for cmd, desc in _COMMANDS.items()}
+)
+
+# Prebuilt formatted-text rows, so rendering the menu only picks tuples
+_MENU_ITEM_ROWS = {cmd: ('class:menu-item', label) for cmd, label in _COMMAND_DISPLAYS.items()}
+_MENU_SELECTED_ROWS = {cmd: ('class:menu-selected', label) for cmd, label in _COMMAND_DISPLAYS.items()}
+_MENU_NEWLINE = ('', '\n')
+
+
 class CustomCommandMenu:
     """Custom command menu that appears below the prompt"""
     
+    __slots__ = (
+        'commands', 'displays', '_last_query',
+        'filtered_commands', 'selected_index', 'visible',
+    )
+    
     def __init__(self):
-        self.commands = {
-            '/exit': 'Exit the AI Shell',
-            '/quit': 'Exit the AI Shell',
-            '/clear': 'Clear conversation history and start fresh',
-            '/new': 'Clear conversation history and start fresh',
-            '/reset': 'Clear conversation history and start fresh',
-            '/help': 'Show help information',
-            '/payload': 'Display current conversation payload',
-            '/save': 'Save current conversation',
-            '/load': 'Load a saved conversation',
-            '/conversations': 'List all saved conversations (use -r to remove)',
-            '/cv': 'List all saved conversations (use -r to remove)',
-            '/archive': 'Archive current conversation',
-            '/delete': 'Delete a saved conversation',
-            '/status': 'Show conversation status',
-            '/models': 'List available models',
-            '/model': 'Switch to a different model',
-            '/ai': 'Switch to AI mode',
-            '/dr': 'Switch to Direct mode',
-            '/inc': 'Toggle incognito mode',
-            '/compact': 'Compact command outputs in current payload',
-            '/recent': 'List recent conversations',
-            '/r': 'List recent conversations'
-        }
+        self.commands = _COMMANDS
+        self.displays = _COMMAND_DISPLAYS
+        self._last_query = None
         self.filtered_commands = []
         self.selected_index = 0
         self.visible = False
     
     def filter_commands(self, query):
         """Filter commands based on query"""
+        if query == self._last_query:
+            return
+        
         if not query or query == '/':
-            self.filtered_commands = list(self.commands.items())
+            self.filtered_commands = _COMMAND_ITEMS
         else:
-            query_lower = query.lower()
-            self.filtered_commands = [
-                (cmd, desc) for cmd, desc in self.commands.items()
-                if cmd.lower().startswith(query_lower)
-            ]
+            lo = bisect.bisect_left(_COMMAND_KEYS_SORTED, query)
+            hi = bisect.bisect_right(_COMMAND_KEYS_SORTED, query + '\uffff', lo)
+            self.filtered_commands = _COMMAND_ITEMS_SORTED[lo:hi]
         
         # Reset selection if current selection is out of bounds
         if self.selected_index >= len(self.filtered_commands):
             self.selected_index = 0
+        
+        self._last_query = query
     
     def move_selection(self, direction):
         """Move selection up (-1) or down (1)"""
@@ -298,18 +456,17 @@ class CustomCommandMenu:
             return ""
         
         lines = []
-        for i, (cmd, desc) in enumerate(self.filtered_commands):
+        for i, (cmd, _) in enumerate(self.filtered_commands):
             if i == self.selected_index:
                 # Selected item with highlight
-                lines.append(('class:menu-selected', f"{cmd} - {desc}"))
+                lines.append(_MENU_SELECTED_ROWS[cmd])
             else:
                 # Regular item
-                lines.append(('class:menu-item', f"{cmd} - {desc}"))
-            lines.append(('', '\n'))
+                lines.append(_MENU_ITEM_ROWS[cmd])
+            lines.append(_MENU_NEWLINE)
         
         # Remove last newline
-        if lines and lines[-1] == ('', '\n'):
-            lines.pop()
+        lines.pop()
         
         return lines
 
@@ -319,24 +476,46 @@ class CustomCompleter(Completer):
     
     def __init__(self, menu):
         self.menu = menu
+        # Completions built for the last seen text, reused while it is unchanged
+        self._last_text = None
+        self._last_completions = []
+        # Completion objects keyed by (command, start_position); typed prefixes
+        # are short, so this stays small and is reused across keystrokes
+        self._completion_cache = {}
     
     def get_completions(self, document, complete_event):
         """Generate completions that persist"""
         text = document.text_before_cursor
         
         if text.startswith('/'):
-            self.menu.filter_commands(text)
+            if text != self._last_text:
+                self.menu.filter_commands(text)
+                
+                # Return all filtered commands - let prompt_toolkit handle selection
+                start = -len(text)
+                self._last_completions = [
+                    self._completion(cmd, start)
+                    for cmd, _ in self.menu.filtered_commands
+                ]
+                self._last_text = text
             
-            # Return all filtered commands - let prompt_toolkit handle selection
-            for cmd, desc in self.menu.filtered_commands:
-                yield Completion(
-                    cmd,
-                    start_position=-len(text),
-                    display=f"{cmd} - {desc}",
-                )
+            yield from self._last_completions
         else:
             # Hide menu when not typing commands
             pass
+    
+    def _completion(self, cmd, start_position):
+        """Return a cached Completion for cmd at the given start position"""
+        key = (cmd, start_position)
+        completion = self._completion_cache.get(key)
+        if completion is None:
+            completion = Completion(
+                cmd,
+                start_position=start_position,
+                display=self.menu.displays[cmd],
+            )
+            self._completion_cache[key] = completion
+        return completion
 
 
 class TerminalInput:
@@ -351,98 +530,167 @@ class TerminalInput:
         '$host': 'Hostname',
     }
     
+    __slots__ = (
+        'config', 'settings', 'prompt_config', 'menu', 'completer', 'style',
+        '_history', '_user', '_host', '_vars',
+        '_prompt_sections', '_prompt_cache', '_style_cache', '_input_kb',
+    )
+    
     def __init__(self, config: dict):
         self.config = config
         self.settings = config.get("settings", {})
         self.prompt_config = config.get("prompt", {})
         
-        # Setup history file
-        history_dir = os.path.expanduser("~/.ai_shell")
-        os.makedirs(history_dir, exist_ok=True)
-        self.history_file = os.path.join(history_dir, "history")
+        # FileHistory (and its directory) is created on first use
+        self._history = None
+        
+        # Username and hostname don't change during a session
+        self._user = getpass.getuser()
+        self._host = socket.gethostname()
+        
+        # Variable substitution map reused across prompts; get_input only
+        # updates the entries that can change between calls
+        self._vars = {
+            '$model': '',
+            '$dir': '',
+            '$mode': '',
+            '$user': self._user,
+            '$host': self._host,
+        }
         
         # Initialize components
-        self.history = FileHistory(self.history_file)
         self.menu = CustomCommandMenu()
         self.completer = CustomCompleter(self.menu)
         
-        # Build style dict (base styles + dynamic per-section styles)
-        self.style = self._build_style()
-    
-    def _build_style(self) -> Style:
-        """Build prompt_toolkit Style with dynamic per-section entries."""
+        # Per-mode prepared prompt sections and built prompts
+        self._prompt_sections = {
+            mode_key: self._prepare_sections(mode_key)
+            for mode_key in ('ai', 'direct', 'incognito')
+        }
+        self._prompt_cache = {}
+        
+        # Base style is shared by every prompt; per-mode section styles are
+        # built on first use and cached by mode key
         from .theme import get_theme
         t = get_theme(self.config)
-        accent = t.get("accent", "#0066cc")
-        accent_alt = t.get("accent_alt", "#00cc66")
-        muted = t.get("muted", "#555555")
-        style_dict = {
-            # Fallback prompt styles (used by confirmation/reason prompts)
-            'prompt.ai': f'{accent} bold',
-            'prompt.direct': f'{accent_alt} bold',
-            'prompt.incognito': '#8b3fbb bold',
-            'prompt.path': muted,
-            # Completion menu styles
-            'completion-menu.completion': 'noinherit',
-            'completion-menu.completion.current': f'#ffffff bg:{accent} bold',
-            'completion-menu.meta': 'noinherit',
-            'completion': 'noinherit',
-            'completion.current': f'#ffffff bg:{accent} bold',
-            'scrollbar.background': 'hidden',
-            'scrollbar.button': 'hidden',
-            'scrollbar.arrow': 'hidden',
-            'scrollbar': 'hidden',
-            'completion-menu.scrollbar': 'hidden',
-            'completion-menu.scrollbar.background': 'hidden',
-            'completion-menu.scrollbar.button': 'hidden',
-            'completion-menu.scrollbar.arrow': 'hidden',
-        }
+        self._style_cache = {}
+        self.style = _base_style(
+            t.get("accent", "#0066cc"),
+            t.get("accent_alt", "#00cc66"),
+            t.get("muted", "#555555"),
+        )
         
-        # Generate styles for every section in every mode
-        for mode_key in ('ai', 'direct', 'incognito'):
-            sections = self.prompt_config.get(mode_key, [])
-            for i, section in enumerate(sections):
-                cls_name = f'ps.{mode_key}.{i}'
-                fg = section.get('fg', '')
-                bg = section.get('bg', '')
-                parts = []
-                if fg:
-                    parts.append(fg)
-                if bg:
-                    parts.append(f'bg:{bg}')
-                style_dict[cls_name] = ' '.join(parts) if parts else ''
-        
-        return Style.from_dict(style_dict)
+        # Key bindings hold no per-call state, so build them once
+        self._input_kb = self._build_keybindings()
+    
+    def _build_keybindings(self) -> KeyBindings:
+        """Build the key bindings used by the main input prompt."""
+        # Custom key bindings - minimal to not interfere with default navigation
+        kb = KeyBindings()
+        
+        @kb.add('escape')
+        def hide_menu(event):
+            """Hide menu"""
+            pass  # Let default completion behavior handle this
+        
+        @kb.add('enter')
+        def submit_on_enter(event):
+            """Enter submits the prompt"""
+            event.current_buffer.validate_and_handle()
+        
+        @kb.add('escape', 'enter')
+        def newline_on_alt_enter(event):
+            """Alt+Enter inserts a newline"""
+            event.current_buffer.insert_text('\n')
+        
+        return kb
+    
+    @property
+    def history(self) -> FileHistory:
+        """Command history, opened lazily on the first prompt that needs it."""
+        if self._history is None:
+            self._history = AsyncFileHistory(_history_file_path())
+        return self._history
+    
+    def _prepare_sections(self, mode_key: str) -> list:
+        """Return (cls_name, raw_text, literal_html) tuples for a mode's sections.
+        
+        Sections without any $variable are escaped once here and stored as
+        ready-made HTML in literal_html; the rest have literal_html = None and
+        are substituted and escaped when the prompt is built.
+        """
+        prepared = []
+        for i, section in enumerate(self.prompt_config.get(mode_key, [])):
+            # Interned so the style and prompt code share one string object
+            cls_name = sys.intern(f'ps.{mode_key}.{i}')
+            raw_text = section.get('text', '')
+            literal_html = None
+            if '$' not in raw_text:
+                literal_html = f'<{cls_name}>{html.escape(raw_text)}</{cls_name}>'
+            prepared.append((cls_name, raw_text, literal_html))
+        return prepared
+    
+    def _mode_style(self, mode_key: str) -> Style:
+        """Return the Style for a mode: the shared base style plus that mode's section styles."""
+        style = self._style_cache.get(mode_key)
+        if style is not None:
+            return style
+        
+        style_dict = {}
+        sections = self.prompt_config.get(mode_key, [])
+        prepared = self._prompt_sections.get(mode_key, ())
+        for (cls_name, _, _), section in zip(prepared, sections):
+            fg = section.get('fg', '')
+            bg = section.get('bg', '')
+            parts = []
+            if fg:
+                parts.append(fg)
+            if bg:
+                parts.append(f'bg:{bg}')
+            style_dict[cls_name] = ' '.join(parts) if parts else ''
+        
+        style = merge_styles([self.style, Style.from_dict(style_dict)])
+        self._style_cache[mode_key] = style
+        return style
     
     def _substitute_variables(self, text: str, variables: dict) -> str:
         """Replace $variable placeholders in text with actual values."""
-        result = text
-        for var_name, var_value in variables.items():
-            result = result.replace(var_name, var_value)
-        return result
+        return _VAR_RE.sub(lambda m: variables.get(m.group(0), m.group(0)), text)
     
-    def _build_prompt(self, mode_key: str, variables: dict) -> HTML:
-        """Build an HTML prompt from configured sections for the given mode.
+    def _build_prompt(self, mode_key: str, variables: dict) -> FormattedText:
+        """Build the prompt from configured sections for the given mode.
         
         Args:
             mode_key: One of 'ai', 'direct', 'incognito'
             variables: Dict mapping variable names ($model, $dir, etc.) to values
         
         Returns:
-            prompt_toolkit HTML formatted text
+            prompt_toolkit FormattedText, parsed from the section HTML once and cached
         """
-        sections = self.prompt_config.get(mode_key, [])
-        html_parts = []
+        key = (mode_key, variables['$model'], variables['$dir'], variables['$mode'])
+        cached = self._prompt_cache.pop(key, None)
+        if cached is not None:
+            # Re-insert so the most recently used prompt is evicted last
+            self._prompt_cache[key] = cached
+            return cached
         
-        for i, section in enumerate(sections):
-            raw_text = section.get('text', '')
+        html_parts = []
+        for cls_name, raw_text, literal_html in self._prompt_sections.get(mode_key, ()):
+            if literal_html is not None:
+                html_parts.append(literal_html)
+                continue
             display_text = self._substitute_variables(raw_text, variables)
             # Escape HTML special chars in the display text
             safe_text = html.escape(display_text)
-            cls_name = f'ps.{mode_key}.{i}'
             html_parts.append(f'<{cls_name}>{safe_text}</{cls_name}>')
         
-        return HTML(''.join(html_parts))
+        prompt_text = to_formatted_text(HTML(''.join(html_parts)))
+        
+        # LRU eviction keeps the cache bounded as $dir changes
+        if len(self._prompt_cache) >= _PROMPT_CACHE_SIZE:
+            self._prompt_cache.pop(next(iter(self._prompt_cache)))
+        self._prompt_cache[key] = prompt_text
+        return prompt_text
     
     def get_input(self, ai_mode: bool, model_name: str = "", incognito_mode: bool = False) -> str:
         """Get user input with custom command menu"""
@@ -459,46 +707,25 @@ class TerminalInput:
             mode_key = 'direct'
             mode_label = 'Direct'
         
-        # Build variable substitution map
-        variables = {
-            '$model': model_name,
-            '$dir': current_dir,
-            '$mode': mode_label,
-            '$user': getpass.getuser(),
-            '$host': socket.gethostname(),
-        }
+        # Update the variable substitution map
+        variables = self._vars
+        variables['$model'] = model_name
+        variables['$dir'] = current_dir
+        variables['$mode'] = mode_label
         
         # Build the prompt from config sections
         prompt_text = self._build_prompt(mode_key, variables)
         
-        # Custom key bindings - minimal to not interfere with default navigation
-        kb = KeyBindings()
-        
-        @kb.add('escape')
-        def hide_menu(event):
-            """Hide menu"""
-            pass  # Let default completion behavior handle this
-        
-        @kb.add('enter')
-        def submit_on_enter(event):
-            """Enter submits the prompt"""
-            event.current_buffer.validate_and_handle()
-        
-        @kb.add('escape', 'enter')
-        def newline_on_alt_enter(event):
-            """Alt+Enter inserts a newline"""
-            event.current_buffer.insert_text('\n')
-        
         try:
             user_input = prompt(
                 prompt_text,
                 history=self.history,
                 completer=self.completer,
                 complete_style=CompleteStyle.COLUMN,  # Single column layout
-                style=self.style,
-                key_bindings=kb,
+                style=self._mode_style(mode_key),
+                key_bindings=self._input_kb,
                 wrap_lines=True,
-                multiline=True,
+                multiline=_HAS_NEWLINE,
                 vi_mode=self.settings.get("vi_mode", False),
             )
             return user_input.strip()
@@ -516,28 +743,6 @@ class TerminalInput:
         except (KeyboardInterrupt, EOFError):
             raise
     
-    def get_reason_input(self, prompt_text: str) -> str:
-        """Get reason/explanation input"""
-        try:
-            return prompt(
-                HTML(f'<prompt.ai>{prompt_text}: </prompt.ai>'),
-                style=self.style,
-                history=self.history,
-                multiline=False
-            ).strip()
-        except (KeyboardInterrupt, EOFError):
-            raise
-    def get_confirmation(self, message: str, default: str = "y") -> str:
-        """Get confirmation input with simpler prompt"""
-        try:
-            result = prompt(
-                HTML(f'<prompt.ai>{message}</prompt.ai>'),
-                style=self.style
-            ).strip()
-            return result if result else default
-        except (KeyboardInterrupt, EOFError):
-            raise
-    
     def get_reason_input(self, prompt_text: str) -> str:
         """Get reason/explanation input"""
         try:
@@ -550,48 +755,47 @@ class TerminalInput:
         except (KeyboardInterrupt, EOFError):
             raise
     
-    def get_confirmation(self, message: str, default: str = "y") -> str:
-        """Get confirmation input with simpler prompt"""
-        try:
-            result = prompt(
-                HTML(f'<prompt.ai>{message}</prompt.ai>'),
-                style=self.style
-            ).strip()
-            # Return default if empty input
-            return result if result else default
-        except (KeyboardInterrupt, EOFError):
-            raise
-    
-    def get_reason_input(self, prompt_text: str) -> str:
-        """Get reason/explanation input"""
-        try:
-            return prompt(
-                HTML(f'<prompt.ai>{prompt_text}: </prompt.ai>'),
-                style=self.style,
-                history=self.history,
-                multiline=False
-            ).strip()
-        except (KeyboardInterrupt, EOFError):
-            raise
+    def _read_choice(self, fd: int) -> str:
+        """Read one keypress from a raw-mode fd and map it to 'y', 'n', or 'a'.
+        
+        'n'/'N' declines and 'a'/'A' approves all. EOF also declines, since there
+        is no one left to confirm. Any other key, including Enter and non-ASCII
+        characters, accepts.
+        """
+        # Read the raw bytes directly, bypassing the buffered text layer
+        data = os.read(fd, 1)
+        if not data:
+            return 'n'
+        # Pull in the rest of a multi-byte UTF-8 character, then drop anything
+        # else the key produced (e.g. escape sequences) so it can't leak into
+        # the next prompt
+        lead = data[0]
+        extra = 3 if lead >= 0xF0 else 2 if lead >= 0xE0 else 1 if lead >= 0xC0 else 0
+        if extra:
+            data += os.read(fd, extra)
+        termios.tcflush(fd, termios.TCIFLUSH)
+        ch = data.decode('utf-8', errors='replace')
+        
+        if ch in ('n', 'N'):
+            return 'n'
+        elif ch in ('a', 'A'):
+            return 'a'
+        else:
+            # Y, Enter, or any other key = accept
+            return 'y'
     
     def get_instant_confirmation(self) -> str:
         """Get instant Y/n/a confirmation via single keypress (no Enter needed).
         Returns 'y', 'n', or 'a'."""
+        # Make sure any buffered prompt text reaches the TTY before the read
+        sys.stdout.flush()
         fd = sys.stdin.fileno()
         old_settings = termios.tcgetattr(fd)
         try:
             tty.setraw(fd)
-            ch = sys.stdin.read(1)
+            return self._read_choice(fd)
         finally:
             termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        
-        if ch in ('n', 'N'):
-            return 'n'
-        elif ch in ('a', 'A'):
-            return 'a'
-        else:
-            # Y, Enter, or any other key = accept
-            return 'y'
 
     def interactive_model_select(self, models: list, current_alias: str) -> str | None:
         """Show an interactive model picker.
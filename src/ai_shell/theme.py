@@ -7,6 +7,10 @@ Provides a configurable color palette used across the entire application.
 Colors are loaded from config.yaml under the 'theme' key, with sensible defaults.
 """
 
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+
 from rich.console import Console
 from rich.theme import Theme as RichTheme
 
@@ -24,19 +28,37 @@ DEFAULT_THEME = {
 }
 
 
-def get_theme(config: dict) -> dict:
-    """Resolve theme colors from config, falling back to defaults."""
+def get_theme(config: dict) -> Mapping[str, str]:
+    """Resolve theme colors from config, falling back to defaults.
+
+    The result is cached per distinct set of overrides and shared between
+    callers, so it is returned as a read-only mapping.
+    """
+    return _resolve_theme(frozenset(config.get("theme", {}).items()))
+
+
+@lru_cache(maxsize=8)
+def _resolve_theme(overrides: frozenset) -> Mapping[str, str]:
+    """Merge frozen ``(key, color)`` overrides onto the default palette."""
     theme = dict(DEFAULT_THEME)
-    theme.update(config.get("theme", {}))
-    return theme
+    theme.update(overrides)
+    return MappingProxyType(theme)
 
 
-def build_rich_theme(theme: dict) -> RichTheme:
+def build_rich_theme(theme: Mapping[str, str]) -> RichTheme:
     """Create a Rich Theme from the resolved theme dict.
 
     Styles are defined *without* bold so callers can compose freely:
     ``[bold accent]Title[/bold accent]`` or ``[accent]normal text[/accent]``.
+    The result is cached per distinct palette.
     """
+    return _build_rich_theme(frozenset(theme.items()))
+
+
+@lru_cache(maxsize=8)
+def _build_rich_theme(theme_items: frozenset) -> RichTheme:
+    """Build the Rich Theme for a palette given as frozen ``(key, color)`` pairs."""
+    theme = dict(theme_items)
     return RichTheme({
         "accent": theme["accent"],
         "accent_alt": theme["accent_alt"],
@@ -58,3 +80,19 @@ def create_console(config: dict | None = None, **kwargs) -> Console:
     theme = get_theme(config or {})
     rich_theme = build_rich_theme(theme)
     return Console(theme=rich_theme, **kwargs)
+
+
+def get_console(config: dict | None = None) -> Console:
+    """Return the shared themed Console for *config*.
+
+    Components with the same palette share one Console, so terminal
+    capability detection runs once per palette rather than per manager.
+    """
+    theme = get_theme(config or {})
+    return _shared_console(build_rich_theme(theme))
+
+
+@lru_cache(maxsize=4)
+def _shared_console(rich_theme: RichTheme) -> Console:
+    """Build the Console for a (cached, hence identity-stable) Rich theme."""
+    return Console(theme=rich_theme)
@@ -1,11 +1,16 @@
 #!/usr/bin/env python
 
+from functools import lru_cache, partial
+from itertools import filterfalse
+
+from rich.console import Group
 from rich.panel import Panel
 from rich.text import Text
 from rich.prompt import Prompt
 from rich.box import Box
 
-from .theme import create_console, get_theme
+from .commands import get_prompt_directory
+from .theme import get_console, get_theme
 
 # Custom box with only a left vertical line (for AI messages)
 # Line extends through top/bottom padding rows
@@ -20,16 +25,13 @@ AI_MSG_BOX = Box(
     "▎   \n"
 )
 
-class UIManager:
-    def __init__(self, config=None):
-        self.theme = get_theme(config or {})
-        self.console = create_console(config)
-        # Keep raw color values handy for border_style / style params
-        self._t = self.theme
-    
-    def show_welcome(self):
-        """Display welcome message"""
-        welcome_text = """
+# Panel factory with the fixed AI message layout pre-bound
+_ai_panel = partial(Panel, box=AI_MSG_BOX, padding=(0, 1))
+
+
+# Static welcome/help bodies, parsed from markup once at import; theme tags are
+# resolved by the console at print time
+_WELCOME_TEXT = Text.from_markup("""
 [bold accent]AI Shell Assistant[/bold accent]
 Type your requests and I'll help you execute commands.
 
@@ -45,18 +47,9 @@ Type your requests and I'll help you execute commands.
 • [accent]Command mode[/accent]: Request actions that will execute commands
 
 [muted]Type your message and press Enter...[/muted]
-        """
-        
-        panel = Panel(
-            welcome_text,
-            title="Welcome",
-            border_style=self._t["accent"]
-        )
-        self.console.print(panel)
-    
-    def show_help(self):
-        """Display help information"""
-        help_text = f"""
+        """)
+
+_HELP_TEXT = Text.from_markup("""
 [bold accent]AI Shell Assistant Help[/bold accent]
 
 [warning]How to use:[/warning]
@@ -114,19 +107,64 @@ Type your requests and I'll help you execute commands.
 • Define sections for each mode: ai, direct, incognito
 • Each section has: text, fg (text color), bg (background color)
 • Available variables: [accent_alt]$model[/accent_alt], [accent_alt]$dir[/accent_alt], [accent_alt]$mode[/accent_alt], [accent_alt]$user[/accent_alt], [accent_alt]$host[/accent_alt]
-        """
-        
-        panel = Panel(
-            help_text,
-            title="Help",
-            border_style=self._t["accent_alt"]
-        )
-        self.console.print(panel)
+        """)
+
+
+def _is_hidden_message(msg: dict) -> bool:
+    """True for system messages and system-generated user messages."""
+    role = msg.get("role", "unknown")
+    return role == "system" or (
+        role == "user" and msg.get("content", "").startswith("SYSTEM MESSAGE:")
+    )
+
+
+@lru_cache(maxsize=4)
+def _welcome_panel(border_style: str) -> Panel:
+    """Return the welcome Panel for a border color, built once and reused."""
+    return Panel(_WELCOME_TEXT, title="Welcome", border_style=border_style)
+
+
+@lru_cache(maxsize=4)
+def _help_panel(border_style: str) -> Panel:
+    """Return the help Panel for a border color, built once and reused."""
+    return Panel(_HELP_TEXT, title="Help", border_style=border_style)
+
+
+class UIManager:
+    __slots__ = (
+        'theme', 'console', '_t',
+        '_ai_default_border', '_ai_default_style', '_ai_block_panel', '_ai_block',
+        '_cmd_style', '_success_border', '_error_border', '_warning_border',
+    )
+    
+    def __init__(self, config=None):
+        self.theme = get_theme(config or {})
+        self.console = get_console(config)
+        # Keep raw color values handy for border_style / style params
+        self._t = self.theme
+        # Default AI panel colors, resolved once rather than per panel
+        self._ai_default_border = self._t["muted"]
+        self._ai_default_style = f"on {self._t['block']}"
+        # Status panel colors and the executing-command style, resolved once
+        self._cmd_style = f"bold {self._t['warning']}"
+        self._success_border = self._t["success"]
+        self._error_border = self._t["error"]
+        self._warning_border = self._t["warning"]
+        # Reused for every show_ai_block call; only the panel body changes
+        self._ai_block_panel = self.ai_panel("")
+        self._ai_block = Group("", self._ai_block_panel, "")
+    
+    def show_welcome(self):
+        """Display welcome message"""
+        self.console.print(_welcome_panel(self._t["accent"]))
+    
+    def show_help(self):
+        """Display help information"""
+        self.console.print(_help_panel(self._t["accent_alt"]))
     
     def get_user_input(self, prompt_text="You", show_directory=True):
         """Get user input with a styled prompt"""
         if show_directory:
-            from .commands import get_prompt_directory
             current_dir = get_prompt_directory()
             return Prompt.ask(f"[bold accent]{prompt_text}[/bold accent] [muted]{current_dir}[/muted]")
         else:
@@ -137,24 +175,27 @@ Type your requests and I'll help you execute commands.
         panel = self.ai_panel(response)
         self.console.print(panel)
     
+    def show_ai_block(self, content):
+        """Display an AI panel padded by blank lines, written in a single print"""
+        self._ai_block_panel.renderable = content
+        self.console.print(self._ai_block)
+    
     def ai_panel(self, content, border_style=None, style=None):
         """Create a styled panel for AI messages — accent line on left, block background"""
-        return Panel(
+        return _ai_panel(
             content,
-            box=AI_MSG_BOX,
-            border_style=border_style or self._t["muted"],
-            style=style or f"on {self._t['block']}",
-            padding=(0, 1),
+            border_style=border_style or self._ai_default_border,
+            style=style or self._ai_default_style,
         )
     
     def show_command_execution(self, command):
         """Display command being executed"""
-        command_text = Text(f"$ {command}", style=f"bold {self._t['warning']}")
+        command_text = Text(f"$ {command}", style=self._cmd_style)
         panel = Panel(
             command_text,
             title="Executing Command",
             title_align="left",
-            border_style=self._t["warning"]
+            border_style=self._warning_border
         )
         self.console.print(panel)
     
@@ -162,10 +203,10 @@ Type your requests and I'll help you execute commands.
         """Display task completion status"""
         if completed:
             status_text = f"[success]✓ Task completed successfully[/success]\n{reason}"
-            border_style = self._t["success"]
+            border_style = self._success_border
         else:
             status_text = f"[error]✗ Task may not have completed[/error]\n{reason}"
-            border_style = self._t["error"]
+            border_style = self._error_border
         
         panel = Panel(
             status_text,
@@ -181,7 +222,7 @@ Type your requests and I'll help you execute commands.
             f"[error]{error_message}[/error]",
             title="Error",
             title_align="left",
-            border_style=self._t["error"]
+            border_style=self._error_border
         )
         self.console.print(panel)
     
@@ -191,7 +232,7 @@ Type your requests and I'll help you execute commands.
             f"[warning]{warning_message}[/warning]",
             title="Warning",
             title_align="left",
-            border_style=self._t["warning"]
+            border_style=self._warning_border
         )
         self.console.print(panel)
     
@@ -205,39 +246,32 @@ Type your requests and I'll help you execute commands.
             return
         
         # Skip system messages and internal system messages for display
-        display_messages = []
-        for msg in payload:
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            
-            # Skip system role messages
-            if role == "system":
-                continue
-            
-            # Skip user messages that are actually system-generated (start with "SYSTEM MESSAGE:")
-            if role == "user" and content.startswith("SYSTEM MESSAGE:"):
-                continue
-            
-            display_messages.append(msg)
+        display_messages = [
+            (msg.get("role", "unknown"), msg.get("content", ""))
+            for msg in filterfalse(_is_hidden_message, payload)
+        ]
         
         if not display_messages:
             return
         
-        self.console.print("\n[bold accent]Previous conversation:[/bold accent]")
+        from rich.markdown import Markdown
+        
+        # Collect every renderable and print them as one Group, so the replay
+        # is rendered and written in a single pass instead of per line
+        render = self.console.render_str
+        ai_panel = self.ai_panel
+        renderables = [render("\n[bold accent]Previous conversation:[/bold accent]")]
+        append = renderables.append
         
-        for message in display_messages:
-            role = message.get("role", "unknown")
-            content = message.get("content", "")
-            
+        for role, content in display_messages:
             if role == "user":
                 # Display user messages as plain text
-                self.console.print(f"\n[bold accent_alt]You:[/bold accent_alt]")
-                self.console.print(f"[fg]{content}[/fg]")
+                append(render("\n[bold accent_alt]You:[/bold accent_alt]"))
+                append(render(f"[fg]{content}[/fg]"))
             elif role == "assistant":
                 # Display assistant messages with left-line panel
-                from rich.markdown import Markdown
-                self.console.print(f"\n[bold accent]Assistant:[/bold accent]")
-                md = Markdown(content)
-                self.console.print(self.ai_panel(md))
+                append(render("\n[bold accent]Assistant:[/bold accent]"))
+                append(ai_panel(Markdown(content)))
         
-        self.console.print(f"\n[muted]--- End of previous conversation ({len(display_messages)} messages) ---[/muted]\n")
+        renderables.append(render(f"\n[muted]--- End of previous conversation ({len(display_messages)} messages) ---[/muted]\n"))
+        self.console.print(Group(*renderables))
@@ -1,9 +1,8 @@
 #!/usr/bin/env python
 
 from typing import Dict, Any, Optional
-from openai import OpenAI
 
-from .theme import create_console, get_theme
+from .theme import get_console, get_theme
 
 
 class WebSearchManager:
@@ -12,7 +11,7 @@ class WebSearchManager:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.theme = get_theme(config)
-        self.console = create_console(config)
+        self.console = get_console(config)
         self.client = None
         self.search_model = None
         self._initialize_client()
@@ -40,6 +39,9 @@ class WebSearchManager:
                 self.console.print("[warning]Warning: API configuration missing for search model. Web search disabled.[/warning]")
                 return
             
+            # Imported here so the SDK only loads when web search is enabled
+            from openai import OpenAI
+            
             self.client = OpenAI(
                 api_key=api_key,
                 base_url=api_url
@@ -70,15 +72,24 @@ class WebSearchManager:
                 {"role": "user", "content": query}
             ]
             
+            parts = []
+            append = parts.append
             with self.console.status(f"[bold accent]Searching with {self.search_model}...[/bold accent]", spinner_style=t["accent"]):
                 response = self.client.chat.completions.create(
                     model=self.search_model,
                     messages=messages,
-                    stream=False
+                    stream=True
                 )
+                
+                for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        append(content)
             
-            if response.choices and response.choices[0].message.content:
-                return response.choices[0].message.content
+            if parts:
+                return "".join(parts)
             
             return None
             